@@ -2,6 +2,140 @@ import streamlit as st
 import gurobipy as gp
 from gurobipy import GRB
 import pandas as pd
+import numpy as np
+from lot_sizing import ww_solve
+
+
+class TimeLimitReached(Exception):
+    """Raised by ``solve`` when Gurobi stops at the time limit.
+
+    Carries the result (with the incumbent, if one was found) so it can be
+    shown without being cached; Streamlit does not cache calls that raise.
+    """
+
+    def __init__(self, result):
+        super().__init__("Gurobi reached the time limit")
+        self.result = result
+
+
+@st.cache_data(max_entries=32)
+def solve(prod_cost, setup_cost, hold_cost, demand, max_prod, wh_cap, solver_params, _warm_state):
+    """Build and solve the planning model and return the results as a plain dict.
+
+    Parameter tables are (n_items, n_periods) NumPy arrays (``wh_cap`` has
+    one entry per period); reruns with identical inputs return the cached
+    results without calling Gurobi again. ``solver_params`` is a tuple of
+    (name, value) Gurobi parameter settings applied before optimizing.
+
+    ``_warm_state`` (the session state, excluded from the cache key) keeps
+    the last model and setup decisions. When only costs change, the stored
+    model is reused with a refreshed objective, and the previous
+    setups are given to Gurobi as a MIP start.
+    """
+    shape = demand.shape
+    structure = (shape, demand.tobytes(), max_prod.tobytes(), wh_cap.tobytes())
+
+    stored = _warm_state.get("gurobi_model")
+    if stored is not None and stored[0] == structure:
+        # Same constraints: only the objective needs refreshing
+        _, model, x, I, y = stored
+    else:
+        # Create model
+        model = gp.Model("ProductionPlanningModel")
+
+        # Create variables
+        x = model.addMVar(shape, lb=0, name="x")  # production quantity
+        I = model.addMVar(shape, lb=0, name="I")  # inventory level
+        y = model.addMVar(shape, vtype=GRB.BINARY, name="y")  # setup decision
+
+        # Add constraints
+        # Inventory balance (no initial inventory in the first period)
+        model.addConstr(x[:, 0] - demand[:, 0] == I[:, 0], name="inv_balance_first")
+        if shape[1] > 1:
+            model.addConstr(I[:, :-1] + x[:, 1:] - demand[:, 1:] == I[:, 1:], name="inv_balance")
+
+        # Production capacity
+        model.addConstr(x <= max_prod * y, name="prod_capacity")
+
+        # Warehouse capacity
+        model.addConstr(I.sum(axis=0) <= wh_cap, name="warehouse_cap")
+
+        _warm_state["gurobi_model"] = (structure, model, x, I, y)
+
+    # Set objective function, keeping the cost components for the breakdown
+    prod_expr = (prod_cost * x).sum()
+    setup_expr = (setup_cost * y).sum()
+    hold_expr = (hold_cost * I).sum()
+    model.setObjective(prod_expr + setup_expr + hold_expr, GRB.MINIMIZE)
+
+    for name, value in solver_params:
+        model.setParam(name, value)
+
+    # Warm start from the previous setup decisions
+    last_y = _warm_state.get("last_y")
+    if last_y is not None and last_y.shape == shape:
+        y.Start = last_y
+
+    # Optimize
+    model.optimize()
+
+    result = {"status": model.Status}
+    if model.SolCount > 0:
+        _warm_state["last_y"] = y.X
+        result["x"] = x.X
+        result["I"] = I.X
+        result["y"] = y.X
+        result["prod_cost"] = float(prod_expr.getValue())
+        result["setup_cost"] = float(setup_expr.getValue())
+        result["holding_cost"] = float(hold_expr.getValue())
+        result["obj_val"] = model.objVal
+    if model.Status == GRB.TIME_LIMIT:
+        # Leave timed-out solves uncached so pressing the button retries them
+        raise TimeLimitReached(result)
+    return result
+
+
+def solve_wagner_whitin(prod_cost_arr, setup_cost_arr, holding_cost_arr, demand_arr,
+                        max_prod_arr, wh_cap_arr):
+    """Plan each item independently with Wagner-Whitin.
+
+    Returns results in the same form as ``solve``, or None when the
+    uncapacitated plan violates a production or warehouse capacity and the
+    MIP has to be solved instead.
+    """
+    x = ww_solve(prod_cost_arr, setup_cost_arr, holding_cost_arr, demand_arr)
+    if (x > max_prod_arr).any():
+        return None
+    inventory = np.cumsum(x - demand_arr, axis=1)
+    if (inventory.sum(axis=0) > wh_cap_arr).any():
+        return None
+    setup = (x > 0).astype(np.float64)
+
+    result = {"status": GRB.OPTIMAL, "x": x, "I": inventory, "y": setup}
+    result["prod_cost"] = (prod_cost_arr * x).sum()
+    result["setup_cost"] = (setup_cost_arr * setup).sum()
+    result["holding_cost"] = (holding_cost_arr * inventory).sum()
+    result["obj_val"] = result["prod_cost"] + result["setup_cost"] + result["holding_cost"]
+    return result
+
+
+def param_table(title, key, index, columns, default):
+    """Render an editable parameter table and return its values as an int32 array.
+
+    ``default(row, col)`` gives the initial value of each cell by position.
+    """
+    st.subheader(title)
+    edited = st.data_editor(
+        pd.DataFrame([[default(i, t) for t in range(len(columns))] for i in range(len(index))],
+                     index=index, columns=columns),
+        key=key,
+        num_rows="fixed",
+        column_config={col: st.column_config.NumberColumn(min_value=0, max_value=np.iinfo(np.int32).max,
+                                                          step=1, required=True)
+                       for col in columns}
+    )
+    return edited.to_numpy(dtype=np.int32)
+
 
 st.title("Joint Production & Warehouse Planning")
 
@@ -15,221 +149,151 @@ n_periods = st.number_input("Number of time periods", min_value=1, value=3, max_
 items = [f"item{i+1}" for i in range(int(n_items))]
 periods = list(range(1, int(n_periods) + 1))
 
-# Production Cost
-st.subheader("Production Cost")
-prod_cost_data = {}
-for i, item in enumerate(items):
-    cols = st.columns(len(periods))
-    for t, period in enumerate(periods):
-        with cols[t]:
-            prod_cost_data[(item, period)] = st.number_input(
-                f"{item}, Period {period}",
-                min_value=0,
-                value=10 + i * 5,
-                key=f"prod_{item}_{period}"
-            )
-
-# Setup Cost
-st.subheader("Setup Cost")
-setup_cost_data = {}
-for i, item in enumerate(items):
-    cols = st.columns(len(periods))
-    for t, period in enumerate(periods):
-        with cols[t]:
-            setup_cost_data[(item, period)] = st.number_input(
-                f"{item}, Period {period}",
-                min_value=0,
-                value=50 + i * 10,
-                key=f"setup_{item}_{period}"
-            )
-
-# Holding Cost
-st.subheader("Holding Cost")
-holding_cost_data = {}
-for i, item in enumerate(items):
-    cols = st.columns(len(periods))
-    for t, period in enumerate(periods):
-        with cols[t]:
-            holding_cost_data[(item, period)] = st.number_input(
-                f"{item}, Period {period}",
-                min_value=0,
-                value=5 + i * 2,
-                key=f"hold_{item}_{period}"
-            )
-
-# Demand
-st.subheader("Demand")
-demand_data = {}
-for i, item in enumerate(items):
-    cols = st.columns(len(periods))
-    for t, period in enumerate(periods):
-        with cols[t]:
-            demand_data[(item, period)] = st.number_input(
-                f"{item}, Period {period}",
-                min_value=0,
-                value=20 + t * 5,
-                key=f"demand_{item}_{period}"
-            )
-
-# Max Production
-st.subheader("Max Production Capacity")
-max_prod_data = {}
-for i, item in enumerate(items):
-    cols = st.columns(len(periods))
-    for t, period in enumerate(periods):
-        with cols[t]:
-            max_prod_data[(item, period)] = st.number_input(
-                f"{item}, Period {period}",
-                min_value=0,
-                value=100,
-                key=f"max_prod_{item}_{period}"
-            )
-
-# Warehouse Capacity
-st.subheader("Warehouse Capacity")
-warehouse_capacity = {}
-cols = st.columns(len(periods))
-for t, period in enumerate(periods):
-    with cols[t]:
-        warehouse_capacity[period] = st.number_input(
-            f"Period {period}",
-            min_value=0,
-            value=200,
-            key=f"wh_cap_{period}"
-        )
-
-# ---- Optimization ----
-st.header("Run Optimization")
-st.write("Click the button below to solve the model")
-
-if st.button("Optimize Production Plan"):
+period_columns = [f"Period {t}" for t in periods]
+
+# Solver settings: the lot-sizing MIP is small and its LP relaxation is
+# tight, so light presolve, no cuts and a single thread solve it fastest.
+with st.sidebar.expander("Advanced solver settings"):
+    presolve = st.selectbox("Presolve", [0, 1, 2], index=1)
+    cuts = st.selectbox("Cuts", [-1, 0, 1, 2, 3], index=1)
+    mip_focus = st.selectbox("MIPFocus", [0, 1, 2, 3], index=1)
+    threads = st.number_input("Threads", min_value=0, value=1, max_value=64)
+    time_limit = st.number_input("Time limit (seconds)", min_value=1, value=30)
+
+solver_params = {
+    "OutputFlag": 0,  # first, so the other settings are not logged
+    "Presolve": presolve,
+    "Cuts": cuts,
+    "MIPFocus": mip_focus,
+    "Threads": int(threads),
+    "TimeLimit": time_limit
+}
+
+# Table edits are batched in a form, so the script only reruns on submit
+with st.form("inputs"):
+    # Parameter tables as (n_items, n_periods) arrays
+    prod_cost_arr = param_table("Production Cost", "prod_cost", items, period_columns,
+                                lambda i, t: 10 + i * 5)
+    setup_cost_arr = param_table("Setup Cost", "setup_cost", items, period_columns,
+                                 lambda i, t: 50 + i * 10)
+    holding_cost_arr = param_table("Holding Cost", "hold_cost", items, period_columns,
+                                   lambda i, t: 5 + i * 2)
+    demand_arr = param_table("Demand", "demand", items, period_columns,
+                             lambda i, t: 20 + t * 5)
+    max_prod_arr = param_table("Max Production Capacity", "max_prod", items, period_columns,
+                               lambda i, t: 100)
+    wh_cap_arr = param_table("Warehouse Capacity", "wh_cap", ["Capacity"], period_columns,
+                             lambda i, t: 200)[0]
+
+    # ---- Optimization ----
+    st.header("Run Optimization")
+    st.write("Click the button below to solve the model")
+    use_wagner_whitin = st.checkbox(
+        "Use Wagner–Whitin (uncapacitated)",
+        help="Plan each item with the Wagner–Whitin dynamic program instead of Gurobi. "
+             "Falls back to Gurobi if the plan exceeds a production or warehouse capacity."
+    )
+    submitted = st.form_submit_button("Optimize Production Plan")
+
+# Results from an earlier submit no longer match the screen once the item/period
+# counts or solver settings change, so drop them until the next submit
+if "last_result" in st.session_state and \
+        st.session_state["last_result"][1:] != (items, period_columns, solver_params):
+    del st.session_state["last_result"]
+
+if submitted or "last_result" in st.session_state:
     try:
         # Create progress messages
         status_placeholder = st.empty()
-        status_placeholder.info("Setting up the model...")
-        
-        # Create model
-        model = gp.Model("ProductionPlanningModel")
-        
-        # Create variables
-        status_placeholder.info("Creating decision variables...")
-        x = {}  # production quantity
-        I = {}  # inventory level
-        y = {}  # setup decision
-        
-        for i in items:
-            for t in periods:
-                x[i, t] = model.addVar(lb=0, name=f"x_{i}_{t}")
-                I[i, t] = model.addVar(lb=0, name=f"I_{i}_{t}")
-                y[i, t] = model.addVar(vtype=GRB.BINARY, name=f"y_{i}_{t}")
-        
-        # Update model to integrate new variables
-        model.update()
-        
-        # Set objective function
-        status_placeholder.info("Setting up objective function...")
-        obj = gp.LinExpr()
-        for i in items:
-            for t in periods:
-                obj += prod_cost_data[(i, t)] * x[i, t]
-                obj += setup_cost_data[(i, t)] * y[i, t]
-                obj += holding_cost_data[(i, t)] * I[i, t]
-        
-        model.setObjective(obj, GRB.MINIMIZE)
-        
-        # Add constraints
-        status_placeholder.info("Adding constraints...")
-        # Inventory balance
-        for i in items:
-            for t in periods:
-                if t == 1:
-                    # First period (no initial inventory)
-                    model.addConstr(x[i, t] - demand_data[(i, t)] == I[i, t], 
-                                   name=f"inv_balance_{i}_{t}")
-                else:
-                    # Subsequent periods
-                    model.addConstr(I[i, t-1] + x[i, t] - demand_data[(i, t)] == I[i, t], 
-                                   name=f"inv_balance_{i}_{t}")
         
-        # Production capacity
-        for i in items:
-            for t in periods:
-                model.addConstr(x[i, t] <= max_prod_data[(i, t)] * y[i, t], 
-                               name=f"prod_capacity_{i}_{t}")
-        
-        # Warehouse capacity
-        for t in periods:
-            model.addConstr(sum(I[i, t] for i in items) <= warehouse_capacity[t], 
-                           name=f"warehouse_cap_{t}")
+        if submitted:
+            result = None
+            if use_wagner_whitin:
+                status_placeholder.info("Running Wagner–Whitin...")
+                result = solve_wagner_whitin(
+                    prod_cost_arr, setup_cost_arr, holding_cost_arr, demand_arr,
+                    max_prod_arr, wh_cap_arr
+                )
+                if result is None:
+                    st.info("The Wagner–Whitin plan violates a capacity constraint, solving with Gurobi instead.")
+            
+            if result is None:
+                # Build and solve (cached on the input tables)
+                status_placeholder.info("Solving the model... This may take a moment.")
+                try:
+                    result = solve(
+                        prod_cost_arr,
+                        setup_cost_arr,
+                        holding_cost_arr,
+                        demand_arr,
+                        max_prod_arr,
+                        wh_cap_arr,
+                        tuple(solver_params.items()),
+                        st.session_state
+                    )
+                except TimeLimitReached as e:
+                    result = e.result
+            
+            # Keep the result (with its labels and settings) so the detail
+            # toggles below can rerun the script without solving again
+            st.session_state["last_result"] = (result, items, period_columns, solver_params)
         
-        # Optimize
-        status_placeholder.info("Solving the model... This may take a moment.")
-        model.optimize()
+        result, result_items, result_columns, _ = st.session_state["last_result"]
         
         # Check results
-        if model.Status == GRB.OPTIMAL:
-            status_placeholder.success("Optimal solution found!")
+        if "x" in result:
+            if result["status"] == GRB.OPTIMAL:
+                status_placeholder.success("Optimal solution found!")
+            else:
+                status_placeholder.warning(f"Solver stopped with status {result['status']} "
+                                           "(e.g. time limit): showing the best solution found, "
+                                           "which is not proven optimal.")
             
             # Create tables for display
             st.header("Results")
+            item_index = pd.Index(result_items, name="Item")
             
             # Production Plan
             st.subheader("Production Plan")
-            prod_data = []
-            for i in items:
-                row = {"Item": i}
-                for t in periods:
-                    row[f"Period {t}"] = round(x[i, t].X, 2)
-                prod_data.append(row)
-            st.table(pd.DataFrame(prod_data).set_index("Item"))
-            
-            # Inventory Levels
-            # st.subheader("Inventory Levels")
-            # inv_data = []
-            # for i in items:
-            #     row = {"Item": i}
-            #     for t in periods:
-            #         row[f"Period {t}"] = round(I[i, t].X, 2)
-            #     inv_data.append(row)
-            # st.table(pd.DataFrame(inv_data).set_index("Item"))
+            st.table(pd.DataFrame(np.round(result["x"], 2), index=item_index, columns=result_columns))
             
-            # Setup Decisions
-            # st.subheader("Setup Decisions (1 = Setup performed)")
-            # setup_data = []
-            # for i in items:
-            #     row = {"Item": i}
-            #     for t in periods:
-            #         row[f"Period {t}"] = int(y[i, t].X)
-            #     setup_data.append(row)
-            # st.table(pd.DataFrame(setup_data).set_index("Item"))
+            # Inventory levels and setup decisions are only built when requested
+            with st.expander("Detailed breakdown"):
+                # Inventory Levels
+                if st.checkbox("Inventory", key="show_inv"):
+                    st.subheader("Inventory Levels")
+                    st.table(pd.DataFrame(np.round(result["I"], 2), index=item_index, columns=result_columns))
+                
+                # Setup Decisions
+                if st.checkbox("Setup decisions", key="show_setup"):
+                    st.subheader("Setup Decisions (1 = Setup performed)")
+                    st.table(pd.DataFrame(result["y"].round().astype(int), index=item_index,
+                                          columns=result_columns))
             
             # Cost Breakdown
             st.subheader("Cost Analysis")
-            prod_cost = sum(prod_cost_data[(i, t)] * x[i, t].X for i in items for t in periods)
-            setup_cost = sum(setup_cost_data[(i, t)] * y[i, t].X for i in items for t in periods)
-            holding_cost = sum(holding_cost_data[(i, t)] * I[i, t].X for i in items for t in periods)
-            
             cost_df = pd.DataFrame({
                 "Cost Component": ["Production Cost", "Setup Cost", "Holding Cost", "Total Cost"],
                 "Amount": [
-                    f"${prod_cost:.2f}",
-                    f"${setup_cost:.2f}",
-                    f"${holding_cost:.2f}",
-                    f"${model.objVal:.2f}"
+                    f"${result['prod_cost']:.2f}",
+                    f"${result['setup_cost']:.2f}",
+                    f"${result['holding_cost']:.2f}",
+                    f"${result['obj_val']:.2f}"
                 ]
             })
             st.table(cost_df)
             
-        elif model.Status == GRB.INFEASIBLE:
+        elif result["status"] == GRB.INFEASIBLE:
             status_placeholder.error("The model is infeasible!")
             st.write("The current set of constraints cannot be satisfied simultaneously.")
             st.write("Try increasing production capacities or warehouse capacities.")
             
         else:
-            status_placeholder.warning(f"Model terminated with status: {model.Status}")
+            status_placeholder.warning(f"Model terminated with status: {result['status']}")
             st.write("Please check your input data and try again.")
             
     except Exception as e:
+        st.session_state.pop("last_result", None)
         st.error(f"An error occurred: {type(e).__name__}")
         st.error(str(e))
         import traceback
@@ -0,0 +1,52 @@
+"""Lot-sizing kernels compiled with Numba.
+
+Kept out of the Streamlit script on purpose: Streamlit re-executes the
+script on every rerun, but imported modules stay loaded, so the compiled
+dispatcher is built once per server process instead of once per rerun.
+"""
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True)
+def ww_solve(prod, setup, hold, demand):
+    """Solve uncapacitated lot-sizing for every item with the Wagner-Whitin DP.
+
+    Takes (n_items, n_periods) arrays of unit production cost, setup cost,
+    unit holding cost and demand, and returns the optimal production
+    quantities in an array of the same shape. Runs in O(T^2) per item: F[j]
+    is the cheapest way to cover demand in periods 0..j-1, and each
+    production period k covers a contiguous run k..t.
+    """
+    n_items, T = demand.shape
+    production = np.zeros((n_items, T))
+    F = np.empty(T + 1)
+    pred = np.empty(T + 1, dtype=np.int64)
+    for i in range(n_items):
+        F[:] = np.inf
+        F[0] = 0.0
+        pred[:] = -1
+        for k in range(T):
+            # A period without demand can be skipped without producing
+            if demand[i, k] == 0 and F[k] < F[k + 1]:
+                F[k + 1] = F[k]
+                pred[k + 1] = -1
+            cost = F[k] + setup[i, k]
+            unit = prod[i, k]
+            for t in range(k, T):
+                cost += unit * demand[i, t]
+                if cost < F[t + 1]:
+                    F[t + 1] = cost
+                    pred[t + 1] = k
+                unit += hold[i, t]
+
+        # Backtrack the production periods
+        j = T
+        while j > 0:
+            k = pred[j]
+            if k < 0:
+                j -= 1
+            else:
+                production[i, k] = demand[i, k:j].sum()
+                j = k
+    return production